@@ -18,7 +18,7 @@ from pybindgen.typehandlers.base import Parameter, ReturnValue, \
     DeclarationsScope, CodeBlock, NotSupportedError, ForwardWrapperBase, ReverseWrapperBase, \
     TypeConfigurationError
 
-from pybindgen.typehandlers.codesink import NullCodeSink, MemoryCodeSink
+from pybindgen.typehandlers.codesink import NullCodeSink, MemoryCodeSink, write_lines
 
 from pybindgen.cppattribute import CppInstanceAttributeGetter, CppInstanceAttributeSetter, \
     CppStaticAttributeGetter, CppStaticAttributeSetter, \
@@ -47,6 +47,14 @@ try:
 except NameError:
     from sets import Set as set
 
+try:
+    intern
+except NameError:
+    intern = sys.intern
+
+## marks a memoized value as "not computed yet", where None is a valid result
+_UNSET = object()
+
 def _type_no_ref(value_type):
     if value_type.type_traits.type_is_reference:
         return str(value_type.type_traits.target)
@@ -114,21 +122,17 @@ class MemoryPolicy(object):
         return ''
 
     def register_ptr_parameter_and_return(self, cls, name):
-        class ThisClassPtrParameter(CppClassPtrParameter):
-            """Register this C++ class as pass-by-pointer parameter"""
-            CTYPES = []
-            cpp_class = cls
-        cls.ThisClassPtrParameter = ThisClassPtrParameter
+        cls.ThisClassPtrParameter = make_cpp_class_type_handler(
+            CppClassPtrParameter, cls, 'ThisClassPtrParameter',
+            "Register C++ class %s as pass-by-pointer parameter" % name)
         try:
             param_type_matcher.register(name+'*', cls.ThisClassPtrParameter)
         except ValueError:
             pass
 
-        class ThisClassPtrReturn(CppClassPtrReturnValue):
-            """Register this C++ class as pointer return"""
-            CTYPES = []
-            cpp_class = cls
-        cls.ThisClassPtrReturn = ThisClassPtrReturn
+        cls.ThisClassPtrReturn = make_cpp_class_type_handler(
+            CppClassPtrReturnValue, cls, 'ThisClassPtrReturn',
+            "Register C++ class %s as pointer return" % name)
         try:
             return_type_matcher.register(name+'*', cls.ThisClassPtrReturn)
         except ValueError:
@@ -675,8 +679,15 @@ class CppClass(object):
         self.metaclass_name = "***GIVE ME A NAME***"
         self.pytypestruct = "***GIVE ME A NAME***"
 
-        self.instance_attributes = PyGetSetDef("%s__getsets" % self._pystruct)
-        self.static_attributes = PyGetSetDef("%s__getsets" % self.metaclass_name)
+        ## names derived from the above, computed once by _update_names()
+        self.pystruct_ptr = None # "PyFoo*"
+        self.pytypestruct_amp = None # "&PyFoo_Type"
+        self.methods_table_name = None
+        self.tp_dealloc_name = None
+
+        ## getset tables, created on first use since most classes have none
+        self._instance_attributes = None
+        self._static_attributes = None
 
         if isinstance(parent, list):
             self.bases = list(parent)
@@ -717,6 +728,10 @@ class CppClass(object):
             else:
                 self.memory_policy = memory_policy
 
+        ## whether returned objects are shared by reference counting rather
+        ## than copied; decided once here for all the return value handlers
+        self.reference_counted = isinstance(self.memory_policy, ReferenceCountingPolicy)
+
         if automatic_type_narrowing is None:
             if not self.bases:
                 self.automatic_type_narrowing = settings.automatic_type_narrowing
@@ -740,37 +755,31 @@ class CppClass(object):
             self.allow_subclassing = False
 
         self.typeid_map_name = None
+        self._type_narrowing_root = _UNSET
 
         if name != 'dummy':
             ## register type handlers
 
-            class ThisClassParameter(CppClassParameter):
-                """Register this C++ class as pass-by-value parameter"""
-                CTYPES = []
-                cpp_class = self
-            self.ThisClassParameter = ThisClassParameter
+            self.ThisClassParameter = make_cpp_class_type_handler(
+                CppClassParameter, self, 'ThisClassParameter',
+                "Register C++ class %s as pass-by-value parameter" % name)
             try:
                 param_type_matcher.register(name, self.ThisClassParameter)
             except ValueError:
                 pass
 
-
-            class ThisClassRefParameter(CppClassRefParameter):
-                """Register this C++ class as pass-by-reference parameter"""
-                CTYPES = []
-                cpp_class = self
-            self.ThisClassRefParameter = ThisClassRefParameter
+            self.ThisClassRefParameter = make_cpp_class_type_handler(
+                CppClassRefParameter, self, 'ThisClassRefParameter',
+                "Register C++ class %s as pass-by-reference parameter" % name)
             try:
                 param_type_matcher.register(name+'&', self.ThisClassRefParameter)
             except ValueError:
                 pass
 
-            class ThisClassReturn(CppClassReturnValue):
-                """Register this C++ class as value return"""
-                CTYPES = []
-                cpp_class = self
-            self.ThisClassReturn = ThisClassReturn
-            self.ThisClassRefReturn = ThisClassReturn
+            self.ThisClassReturn = make_cpp_class_type_handler(
+                CppClassReturnValue, self, 'ThisClassReturn',
+                "Register C++ class %s as value return" % name)
+            self.ThisClassRefReturn = self.ThisClassReturn
             try:
                 return_type_matcher.register(name, self.ThisClassReturn)
                 return_type_matcher.register(name, self.ThisClassRefReturn)
@@ -780,32 +789,25 @@ class CppClass(object):
             if self.memory_policy is not None:
                 self.memory_policy.register_ptr_parameter_and_return(self, name)
             else: # Regular pointer
-                class ThisClassPtrParameter(CppClassPtrParameter):
-                    """Register this C++ class as pass-by-pointer parameter"""
-                    CTYPES = []
-                    cpp_class = self
-                self.ThisClassPtrParameter = ThisClassPtrParameter
+                self.ThisClassPtrParameter = make_cpp_class_type_handler(
+                    CppClassPtrParameter, self, 'ThisClassPtrParameter',
+                    "Register C++ class %s as pass-by-pointer parameter" % name)
                 try:
                     param_type_matcher.register(name+'*', self.ThisClassPtrParameter)
                 except ValueError:
                     pass
 
-                class ThisClassPtrReturn(CppClassPtrReturnValue):
-                    """Register this C++ class as pointer return"""
-                    CTYPES = []
-                    cpp_class = self
-                self.ThisClassPtrReturn = ThisClassPtrReturn
+                self.ThisClassPtrReturn = make_cpp_class_type_handler(
+                    CppClassPtrReturnValue, self, 'ThisClassPtrReturn',
+                    "Register C++ class %s as pointer return" % name)
                 try:
                     return_type_matcher.register(name+'*', self.ThisClassPtrReturn)
                 except ValueError:
                     pass
 
-
-            class ThisClassRefReturn(CppClassRefReturnValue):
-                """Register this C++ class as reference return"""
-                CTYPES = []
-                cpp_class = self
-            self.ThisClassRefReturn = ThisClassRefReturn
+            self.ThisClassRefReturn = make_cpp_class_type_handler(
+                CppClassRefReturnValue, self, 'ThisClassRefReturn',
+                "Register C++ class %s as reference return" % name)
             try:
                 return_type_matcher.register(name+'&', self.ThisClassRefReturn)
             except ValueError:
@@ -1202,12 +1204,20 @@ class CppClass(object):
         self.metaclass_name = "%sMeta" % self.mangled_full_name
         self.pytypestruct = "Py%s%s_Type" % (prefix,  self.mangled_full_name)
 
-        self.instance_attributes.cname = "%s__getsets" % self._pystruct
-        self.static_attributes.cname = "%s__getsets" % self.metaclass_name
+        self.pystruct_ptr = self._pystruct + '*'
+        self.pytypestruct_amp = '&' + self.pytypestruct
+        self.methods_table_name = "%s_methods" % self._pystruct
+        self.tp_dealloc_name = "_wrap_%s__tp_dealloc" % self._pystruct
+
+        if self._instance_attributes is not None:
+            self._instance_attributes.cname = "%s__getsets" % self._pystruct
+        if self._static_attributes is not None:
+            self._static_attributes.cname = "%s__getsets" % self.metaclass_name
 
         ## re-register the class type handlers, now with class full name
         self.register_alias(self.full_name)
 
+        self._type_narrowing_root = _UNSET
         if self.get_type_narrowing_root() is self:
             self.typeid_map_name = "%s__typeid_map" % self.pystruct
         else:
@@ -1264,6 +1274,22 @@ class CppClass(object):
 
     module = property(get_module, set_module)
 
+    def get_instance_attributes(self):
+        """Get the PyGetSetDef of instance attributes, creating it if necessary"""
+        if self._instance_attributes is None:
+            self._instance_attributes = PyGetSetDef("%s__getsets" % self._pystruct)
+        return self._instance_attributes
+
+    instance_attributes = property(get_instance_attributes)
+
+    def get_static_attributes(self):
+        """Get the PyGetSetDef of static attributes, creating it if necessary"""
+        if self._static_attributes is None:
+            self._static_attributes = PyGetSetDef("%s__getsets" % self.metaclass_name)
+        return self._static_attributes
+
+    static_attributes = property(get_static_attributes)
+
 
     def inherit_default_constructors(self):
         """inherit the default constructors from the parentclass according to C++
@@ -1297,19 +1323,22 @@ class CppClass(object):
         """Find the root CppClass along the subtree of all parent classes that
         have automatic_type_narrowing=True Note: multiple inheritance
         not implemented"""
+        if self._type_narrowing_root is not _UNSET:
+            return self._type_narrowing_root
         if not self.automatic_type_narrowing:
-            return None
-        root = self
-        while (root.parent is not None
-               and root.parent.automatic_type_narrowing):
-            root = root.parent
+            root = None
+        else:
+            root = self
+            while (root.parent is not None
+                   and root.parent.automatic_type_narrowing):
+                root = root.parent
+        self._type_narrowing_root = root
         return root
 
     def _register_typeid(self, module):
         """register this class with the typeid map root class"""
         root = self.get_type_narrowing_root()
-        module.after_init.write_code("%s.register_wrapper(typeid(%s), &%s);"
-                                     % (root.typeid_map_name, self.full_name, self.pytypestruct))
+        module.typeid_registrations.append((root.typeid_map_name, self.full_name, self.pytypestruct))
 
     def _generate_typeid_map(self, code_sink, module):
         """generate the typeid map and fill it with values"""
@@ -1820,8 +1849,9 @@ public:
         else:
             pointer_type = self.full_name + " *"
 
+        lines = []
         if self.allow_subclassing:
-            code_sink.writeln('''
+            lines.append('''
 typedef struct {
     PyObject_HEAD
     %sobj;
@@ -1832,7 +1862,7 @@ typedef struct {
 
         else:
 
-            code_sink.writeln('''
+            lines.append('''
 typedef struct {
     PyObject_HEAD
     %sobj;
@@ -1840,17 +1870,18 @@ typedef struct {
 } %s;
     ''' % (pointer_type, self.pystruct))
 
-        code_sink.writeln()
+        lines.append('')
 
         if self.import_from_module:
-            code_sink.writeln('extern PyTypeObject *_%s;' % (self.pytypestruct,))
-            code_sink.writeln('#define %s (*_%s)' % (self.pytypestruct, self.pytypestruct))
+            lines.append('extern PyTypeObject *_%s;' % self.pytypestruct)
+            lines.append('#define %s (*_%s)' % (self.pytypestruct, self.pytypestruct))
         else:
-            code_sink.writeln('extern PyTypeObject %s;' % (self.pytypestruct,))
-            if not self.static_attributes.empty():
-                code_sink.writeln('extern PyTypeObject Py%s_Type;' % (self.metaclass_name,))
+            lines.append('extern PyTypeObject %s;' % self.pytypestruct)
+            if self._static_attributes is not None and not self._static_attributes.empty():
+                lines.append('extern PyTypeObject Py%s_Type;' % self.metaclass_name)
 
-        code_sink.writeln()
+        lines.append('')
+        write_lines(code_sink, lines)
 
         if self.helper_class is not None:
             self._inherit_helper_class_parent_virtuals()
@@ -1939,6 +1970,8 @@ typedef struct {
             self._generate_import_from_module(code_sink, module)
             return # .......................... RETURN
 
+        pytypestruct = self.pytypestruct
+
         if self.typeid_map_name is not None:
             code_sink.writeln("\npybindgen::TypeMap %s;\n" % self.typeid_map_name)
             module.after_init.write_code("PyModule_AddObject(m, (char *) \"_%s\", PyCObject_FromVoidPtr(&%s, NULL));"
@@ -1956,9 +1989,15 @@ typedef struct {
             parent_caller_methods = []
 
         ## generate getsets
-        instance_getsets = self.instance_attributes.generate(code_sink)
+        if self._instance_attributes is None:
+            instance_getsets = '0'
+        else:
+            instance_getsets = self._instance_attributes.generate(code_sink)
         self.slots.setdefault("tp_getset", instance_getsets)
-        static_getsets = self.static_attributes.generate(code_sink)
+        if self._static_attributes is None:
+            static_getsets = '0'
+        else:
+            static_getsets = self._static_attributes.generate(code_sink)
 
         ## --- register the class type in the module ---
         module.after_init.write_code("/* Register the '%s' class */" % self.full_name)
@@ -1973,37 +2012,37 @@ typedef struct {
                 parent_typestruct = self.parent.pytypestruct
             metaclass = PyMetaclass(self.metaclass_name,
                                     "Py_TYPE(&%s)" % parent_typestruct,
-                                    self.static_attributes)
+                                    self._static_attributes)
             metaclass.generate(code_sink, module)
 
         if self.parent is not None:
             assert isinstance(self.parent, CppClass)
             module.after_init.write_code('%s.tp_base = &%s;' %
-                                         (self.pytypestruct, self.parent.pytypestruct))
+                                         (pytypestruct, self.parent.pytypestruct))
             if len(self.bases) > 1:
-                module.after_init.write_code('%s.tp_bases = PyTuple_New(%i);' % (self.pytypestruct, len(self.bases),))
+                module.after_init.write_code('%s.tp_bases = PyTuple_New(%i);' % (pytypestruct, len(self.bases),))
                 for basenum, base in enumerate(self.bases):
                     module.after_init.write_code('    Py_INCREF((PyObject *) &%s);' % (base.pytypestruct,))
                     module.after_init.write_code('    PyTuple_SET_ITEM(%s.tp_bases, %i, (PyObject *) &%s);'
-                                                 % (self.pytypestruct, basenum, base.pytypestruct))
+                                                 % (pytypestruct, basenum, base.pytypestruct))
 
         if metaclass is not None:
             module.after_init.write_code('Py_TYPE(&%s) = &%s;' %
-                                         (self.pytypestruct, metaclass.pytypestruct))
+                                         (pytypestruct, metaclass.pytypestruct))
 
         module.after_init.write_error_check('PyType_Ready(&%s)'
-                                          % (self.pytypestruct,))
+                                          % (pytypestruct,))
 
         class_python_name = self.get_python_name()
 
         if self.outer_class is None:
             module.after_init.write_code(
                 'PyModule_AddObject(m, (char *) \"%s\", (PyObject *) &%s);' % (
-                class_python_name, self.pytypestruct))
+                class_python_name, pytypestruct))
         else:
             module.after_init.write_code(
                 'PyDict_SetItemString((PyObject*) %s.tp_dict, (char *) \"%s\", (PyObject *) &%s);' % (
-                self.outer_class.pytypestruct, class_python_name, self.pytypestruct))
+                self.outer_class.pytypestruct, class_python_name, pytypestruct))
 
         have_constructor = self._generate_constructor(code_sink)
 
@@ -2200,7 +2239,7 @@ typedef struct {
     def _generate_type_structure(self, code_sink, docstring):
         """generate the type structure"""
         self.slots.setdefault("tp_basicsize",
-                              "sizeof(%s)" % (self.pystruct,))
+                              "sizeof(%s)" % self.pystruct)
         tp_flags = set(['Py_TPFLAGS_DEFAULT'])
         if self.allow_subclassing:
             tp_flags.add("Py_TPFLAGS_HAVE_GC")
@@ -2211,13 +2250,15 @@ typedef struct {
             self.slots.setdefault("tp_dictoffset", "0")
         if self.binary_numeric_operators:
             tp_flags.add("Py_TPFLAGS_CHECKTYPES")
-        self.slots.setdefault("tp_flags", '|'.join(sorted(tp_flags)))
+        ## interned, as only a handful of distinct flag combinations
+        ## exist and the value is part of PyTypeObject's template cache key
+        self.slots.setdefault("tp_flags", intern('|'.join(sorted(tp_flags))))
 
         if docstring is None:
             docstring = self.generate_docstring()
 
         self.slots.setdefault("tp_doc", (docstring is None and 'NULL'
-                                         or "\"%s\"" % (docstring,)))
+                                         or "\"%s\"" % docstring))
         dict_ = self.slots
         dict_.setdefault("typestruct", self.pytypestruct)
 
@@ -2394,18 +2435,22 @@ static PyObject*\n%s(%s *self, PyObject *PYBINDGEN_UNUSED(_args))
 
     def _generate_methods(self, code_sink, parent_caller_methods):
         """generate the method wrappers"""
+        ## methods registered via special type slots, not method table
+        slot_methods = set(self.valid_sequence_methods)
+        slot_methods.add('__call__')
+
+        writeln = code_sink.writeln
         method_defs = []
         for meth_name, overload in self.methods.items():
-            code_sink.writeln()
+            writeln()
             #overload.generate(code_sink)
             try:
                 utils.call_with_error_handling(overload.generate, (code_sink,), {}, overload)
             except utils.SkipWrapper:
                 continue
-            # skip methods registered via special type slots, not method table
-            if meth_name not in (['__call__'] + list(self.valid_sequence_methods)):
+            if meth_name not in slot_methods:
                 method_defs.append(overload.get_py_method_def(meth_name))
-            code_sink.writeln()
+            writeln()
         method_defs.extend(parent_caller_methods)
 
         if len(self.bases) > 1: # https://bugs.launchpad.net/pybindgen/+bug/563786
@@ -2420,14 +2465,13 @@ static PyObject*\n%s(%s *self, PyObject *PYBINDGEN_UNUSED(_args))
                 method_defs.append('{(char *) "__copy__", (PyCFunction) %s, METH_NOARGS, NULL},' % copy_wrapper_name)
 
         ## generate the method table
-        code_sink.writeln("static PyMethodDef %s_methods[] = {" % (self.pystruct,))
+        code_sink.writeln("static PyMethodDef %s[] = {" % self.methods_table_name)
         code_sink.indent()
-        for methdef in method_defs:
-            code_sink.writeln(methdef)
-        code_sink.writeln("{NULL, NULL, 0, NULL}")
+        method_defs.append("{NULL, NULL, 0, NULL}")
+        write_lines(code_sink, method_defs)
         code_sink.unindent()
         code_sink.writeln("};")
-        self.slots.setdefault("tp_methods", "%s_methods" % (self.pystruct,))
+        self.slots.setdefault("tp_methods", self.methods_table_name)
 
     def _get_delete_code(self):
         if self.is_singleton:
@@ -2553,7 +2597,7 @@ static int
         if "tp_dealloc" in self.slots:
             return
 
-        tp_dealloc_function_name = "_wrap_%s__tp_dealloc" % (self.pystruct,)
+        tp_dealloc_function_name = self.tp_dealloc_name
         code_sink.writeln(r'''
 static void
 %s(%s *self)
@@ -2654,7 +2698,7 @@ if (!PyObject_IsInstance((PyObject*) other, (PyObject*) &%s)) {
         else:
             new_func = 'PyObject_New'
         if wrapper_type is None:
-            wrapper_type = '&'+self.pytypestruct
+            wrapper_type = self.pytypestruct_amp
         code_block.write_code("%s = %s(%s, %s);" %
                               (lvalue, new_func, self.pystruct, wrapper_type))
         if self.allow_subclassing:
@@ -2697,8 +2741,7 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
         ## automatic_type_narrowing is active and we are not forced to
         ## make a copy of the object
         if (cpp_class.automatic_type_narrowing
-            and (caller_owns_return or isinstance(cpp_class.memory_policy,
-                                                  ReferenceCountingPolicy))):
+            and (caller_owns_return or cpp_class.reference_counted)):
 
             typeid_map_name = cpp_class.get_type_narrowing_root().typeid_map_name
             wrapper_type = code_block.declare_variable(
@@ -2709,7 +2752,7 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
 
         else:
 
-            wrapper_type = '&'+cpp_class.pytypestruct
+            wrapper_type = cpp_class.pytypestruct_amp
 
         ## Create the Python wrapper object
         cpp_class.write_allocate_pystruct(code_block, py_name, wrapper_type)
@@ -2727,7 +2770,7 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
             code_block.write_code(
                 "%s->flags = PYBINDGEN_WRAPPER_FLAG_NONE;" % (py_name,))
         else:
-            if not isinstance(cpp_class.memory_policy, ReferenceCountingPolicy):
+            if not cpp_class.reference_counted:
                 if reference_existing_object:
                     if type_traits.target_is_const:
                         code_block.write_code("%s->obj = (%s *) (%s);" % (py_name, cpp_class.full_name, value_ptr))
@@ -2807,7 +2850,7 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
             # If we are already referencing the existing python wrapper,
             # we do not need a reference to the C++ object as well.
             if caller_owns_return and \
-                    isinstance(cpp_class.memory_policy, ReferenceCountingPolicy):
+                    cpp_class.reference_counted:
                 code_block.write_code("} else {")
                 code_block.indent()
                 cpp_class.memory_policy.write_decref(code_block, value_ptr)
@@ -2839,7 +2882,7 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
         # We are already referencing the existing python wrapper,
         # so we do not need a reference to the C++ object as well.
         if caller_owns_return and \
-                isinstance(cpp_class.memory_policy, ReferenceCountingPolicy):
+                cpp_class.reference_counted:
             cpp_class.memory_policy.write_decref(code_block, value_ptr)
 
         code_block.write_code("Py_INCREF(%s);" % py_name)
@@ -2876,7 +2919,7 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
 
             # handle ownership rules...
             if caller_owns_return and \
-                    isinstance(cpp_class.memory_policy, ReferenceCountingPolicy):
+                    cpp_class.reference_counted:
                 code_block.write_code("} else {")
                 code_block.indent()
                 # If we are already referencing the existing python wrapper,
@@ -2892,6 +2935,20 @@ def common_shared_object_return(value, py_name, cpp_class, code_block,
 
 
 
+def make_cpp_class_type_handler(handler_class, cpp_class, name, doc):
+    """
+    Creates a subclass of one of the generic C++ class type handlers
+    (CppClassParameter, CppClassPtrReturnValue, etc.) bound to a
+    specific CppClass, with its own CTYPES list, ready to be
+    registered with the type matchers.
+
+    :param name: name of the new class, e.g. 'ThisClassParameter'
+    :param doc: docstring of the new class
+    """
+    return type(str(name), (handler_class,),
+                {'CTYPES': [], 'cpp_class': cpp_class, '__doc__': doc})
+
+
 class CppClassParameterBase(Parameter):
     "Base class for all C++ Class parameter handlers"
     CTYPES = []
@@ -2940,49 +2997,50 @@ class CppClassParameter(CppClassParameterBase):
         "parses python args to get C++ value"
         #assert isinstance(wrapper, ForwardWrapperBase)
         #assert isinstance(self.cpp_class, cppclass.CppClass)
+        cpp_class = self.cpp_class
 
         if self.take_value_from_python_self:
             self.py_name = 'self'
             wrapper.call_params.append(
-                '*((%s *) %s)->obj' % (self.cpp_class.pystruct, self.py_name))
+                '*((%s *) %s)->obj' % (cpp_class.pystruct, self.py_name))
         else:
-            implicit_conversion_sources = self.cpp_class.get_all_implicit_conversions()
+            implicit_conversion_sources = cpp_class.get_all_implicit_conversions()
             if not implicit_conversion_sources:
                 if self.default_value is not None:
-                    self.cpp_class.get_construct_name() # raises an exception if the class cannot be constructed
+                    cpp_class.get_construct_name() # raises an exception if the class cannot be constructed
                     self.py_name = wrapper.declarations.declare_variable(
-                        self.cpp_class.pystruct+'*', self.name, 'NULL')
+                        cpp_class.pystruct_ptr, self.name, 'NULL')
                     wrapper.parse_params.add_parameter(
-                        'O!', ['&'+self.cpp_class.pytypestruct, '&'+self.py_name], self.name, optional=True)
+                        'O!', [cpp_class.pytypestruct_amp, '&'+self.py_name], self.name, optional=True)
                     wrapper.call_params.append(
-                        '(%s ? (*((%s *) %s)->obj) : %s)' % (self.py_name, self.cpp_class.pystruct, self.py_name, self.default_value))
+                        '(%s ? (*((%s *) %s)->obj) : %s)' % (self.py_name, cpp_class.pystruct, self.py_name, self.default_value))
                 else:
                     self.py_name = wrapper.declarations.declare_variable(
-                        self.cpp_class.pystruct+'*', self.name)
+                        cpp_class.pystruct_ptr, self.name)
                     wrapper.parse_params.add_parameter(
-                        'O!', ['&'+self.cpp_class.pytypestruct, '&'+self.py_name], self.name)
+                        'O!', [cpp_class.pytypestruct_amp, '&'+self.py_name], self.name)
                     wrapper.call_params.append(
-                        '*((%s *) %s)->obj' % (self.cpp_class.pystruct, self.py_name))
+                        '*((%s *) %s)->obj' % (cpp_class.pystruct, self.py_name))
             else:
                 if self.default_value is None:
                     self.py_name = wrapper.declarations.declare_variable(
                         'PyObject*', self.name)
                     tmp_value_variable = wrapper.declarations.declare_variable(
-                        self.cpp_class.full_name, self.name)
+                        cpp_class.full_name, self.name)
                     wrapper.parse_params.add_parameter('O', ['&'+self.py_name], self.name)
                 else:
                     self.py_name = wrapper.declarations.declare_variable(
                         'PyObject*', self.name, 'NULL')
                     tmp_value_variable = wrapper.declarations.declare_variable(
-                        self.cpp_class.full_name, self.name)
+                        cpp_class.full_name, self.name)
                     wrapper.parse_params.add_parameter('O', ['&'+self.py_name], self.name, optional=True)
 
                 if self.default_value is None:
                     wrapper.before_call.write_code("if (PyObject_IsInstance(%s, (PyObject*) &%s)) {\n"
                                                    "    %s = *((%s *) %s)->obj;" %
-                                                   (self.py_name, self.cpp_class.pytypestruct,
+                                                   (self.py_name, cpp_class.pytypestruct,
                                                     tmp_value_variable,
-                                                    self.cpp_class.pystruct, self.py_name))
+                                                    cpp_class.pystruct, self.py_name))
                 else:
                     wrapper.before_call.write_code(
                         "if (%s == NULL) {\n"
@@ -2991,9 +3049,9 @@ class CppClassParameter(CppClassParameterBase):
                     wrapper.before_call.write_code(
                         "} else if (PyObject_IsInstance(%s, (PyObject*) &%s)) {\n"
                                                    "    %s = *((%s *) %s)->obj;" %
-                                                   (self.py_name, self.cpp_class.pytypestruct,
+                                                   (self.py_name, cpp_class.pytypestruct,
                                                     tmp_value_variable,
-                                                    self.cpp_class.pystruct, self.py_name))
+                                                    cpp_class.pystruct, self.py_name))
                 for conversion_source in implicit_conversion_sources:
                     wrapper.before_call.write_code("} else if (PyObject_IsInstance(%s, (PyObject*) &%s)) {\n"
                                                    "    %s = *((%s *) %s)->obj;" %
@@ -3002,7 +3060,7 @@ class CppClassParameter(CppClassParameterBase):
                                                     conversion_source.pystruct, self.py_name))
                 wrapper.before_call.write_code("} else {\n")
                 wrapper.before_call.indent()
-                possible_type_names = ", ".join([cls.name for cls in [self.cpp_class] + implicit_conversion_sources])
+                possible_type_names = ", ".join([cls.name for cls in [cpp_class] + implicit_conversion_sources])
                 wrapper.before_call.write_code("PyErr_Format(PyExc_TypeError, \"parameter must an instance of one of the types (%s), not %%s\", Py_TYPE(%s)->tp_name);" % (possible_type_names, self.py_name))
                 wrapper.before_call.write_error_return()
                 wrapper.before_call.unindent()
@@ -3015,7 +3073,7 @@ class CppClassParameter(CppClassParameterBase):
         assert isinstance(wrapper, ReverseWrapperBase)
 
         self.py_name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', 'py_'+self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, 'py_'+self.cpp_class.name)
         self.cpp_class.write_allocate_pystruct(wrapper.before_call, self.py_name)
         if self.cpp_class.allow_subclassing:
             wrapper.before_call.write_code(
@@ -3058,41 +3116,42 @@ class CppClassRefParameter(CppClassParameterBase):
         "parses python args to get C++ value"
         #assert isinstance(wrapper, ForwardWrapperBase)
         #assert isinstance(self.cpp_class, cppclass.CppClass)
+        cpp_class = self.cpp_class
 
         if self.direction == Parameter.DIRECTION_IN:
             if self.take_value_from_python_self:
                 self.py_name = 'self'
                 wrapper.call_params.append(
-                    '*((%s *) %s)->obj' % (self.cpp_class.pystruct, self.py_name))
+                    '*((%s *) %s)->obj' % (cpp_class.pystruct, self.py_name))
             else:
-                implicit_conversion_sources = self.cpp_class.get_all_implicit_conversions()
+                implicit_conversion_sources = cpp_class.get_all_implicit_conversions()
                 if not (implicit_conversion_sources and self.type_traits.target_is_const):
                     if self.default_value is not None:
                         self.py_name = wrapper.declarations.declare_variable(
-                            self.cpp_class.pystruct+'*', self.name, 'NULL')
+                            cpp_class.pystruct_ptr, self.name, 'NULL')
 
                         wrapper.parse_params.add_parameter(
-                            'O!', ['&'+self.cpp_class.pytypestruct, '&'+self.py_name], self.name, optional=True)
+                            'O!', [cpp_class.pytypestruct_amp, '&'+self.py_name], self.name, optional=True)
 
                         if self.default_value_type is not None:
                             default_value_name = wrapper.declarations.declare_variable(
                                 self.default_value_type, "%s_default" % self.name,
                                 self.default_value)
                             wrapper.call_params.append(
-                                '(%s ? (*((%s *) %s)->obj) : %s)' % (self.py_name, self.cpp_class.pystruct,
+                                '(%s ? (*((%s *) %s)->obj) : %s)' % (self.py_name, cpp_class.pystruct,
                                                                      self.py_name, default_value_name))
                         else:
-                            self.cpp_class.get_construct_name() # raises an exception if the class cannot be constructed
+                            cpp_class.get_construct_name() # raises an exception if the class cannot be constructed
                             wrapper.call_params.append(
-                                '(%s ? (*((%s *) %s)->obj) : %s)' % (self.py_name, self.cpp_class.pystruct,
+                                '(%s ? (*((%s *) %s)->obj) : %s)' % (self.py_name, cpp_class.pystruct,
                                                                      self.py_name, self.default_value))
                     else:
                         self.py_name = wrapper.declarations.declare_variable(
-                            self.cpp_class.pystruct+'*', self.name)
+                            cpp_class.pystruct_ptr, self.name)
                         wrapper.parse_params.add_parameter(
-                            'O!', ['&'+self.cpp_class.pytypestruct, '&'+self.py_name], self.name)
+                            'O!', [cpp_class.pytypestruct_amp, '&'+self.py_name], self.name)
                         wrapper.call_params.append(
-                            '*((%s *) %s)->obj' % (self.cpp_class.pystruct, self.py_name))
+                            '*((%s *) %s)->obj' % (cpp_class.pystruct, self.py_name))
                 else:
                     if self.default_value is not None:
                         warnings.warn("with implicit conversions, default value "
@@ -3100,14 +3159,14 @@ class CppClassRefParameter(CppClassParameterBase):
                     self.py_name = wrapper.declarations.declare_variable(
                         'PyObject*', self.name)
                     tmp_value_variable = wrapper.declarations.declare_variable(
-                        self.cpp_class.full_name, self.name)
+                        cpp_class.full_name, self.name)
                     wrapper.parse_params.add_parameter('O', ['&'+self.py_name], self.name)
 
                     wrapper.before_call.write_code("if (PyObject_IsInstance(%s, (PyObject*) &%s)) {\n"
                                                    "    %s = *((%s *) %s)->obj;" %
-                                                   (self.py_name, self.cpp_class.pytypestruct,
+                                                   (self.py_name, cpp_class.pytypestruct,
                                                     tmp_value_variable,
-                                                    self.cpp_class.pystruct, self.py_name))
+                                                    cpp_class.pystruct, self.py_name))
                     for conversion_source in implicit_conversion_sources:
                         wrapper.before_call.write_code("} else if (PyObject_IsInstance(%s, (PyObject*) &%s)) {\n"
                                                        "    %s = *((%s *) %s)->obj;" %
@@ -3116,7 +3175,7 @@ class CppClassRefParameter(CppClassParameterBase):
                                                         conversion_source.pystruct, self.py_name))
                     wrapper.before_call.write_code("} else {\n")
                     wrapper.before_call.indent()
-                    possible_type_names = ", ".join([cls.name for cls in [self.cpp_class] + implicit_conversion_sources])
+                    possible_type_names = ", ".join([cls.name for cls in [cpp_class] + implicit_conversion_sources])
                     wrapper.before_call.write_code("PyErr_Format(PyExc_TypeError, \"parameter must an instance of one of the types (%s), not %%s\", Py_TYPE(%s)->tp_name);" % (possible_type_names, self.py_name))
                     wrapper.before_call.write_error_return()
                     wrapper.before_call.unindent()
@@ -3128,20 +3187,20 @@ class CppClassRefParameter(CppClassParameterBase):
             assert not self.take_value_from_python_self
 
             self.py_name = wrapper.declarations.declare_variable(
-                self.cpp_class.pystruct+'*', self.name)
+                cpp_class.pystruct_ptr, self.name)
 
-            self.cpp_class.write_allocate_pystruct(wrapper.before_call, self.py_name)
-            if self.cpp_class.allow_subclassing:
+            cpp_class.write_allocate_pystruct(wrapper.before_call, self.py_name)
+            if cpp_class.allow_subclassing:
                 wrapper.after_call.write_code(
                     "%s->inst_dict = NULL;" % (self.py_name,))
             wrapper.after_call.write_code("%s->flags = PYBINDGEN_WRAPPER_FLAG_NONE;" % (self.py_name,))
 
-            self.cpp_class.write_create_instance(wrapper.before_call,
+            cpp_class.write_create_instance(wrapper.before_call,
                                                  "%s->obj" % self.py_name,
                                                  '')
-            self.cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, self.py_name,
+            cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, self.py_name,
                                                                        "%s->obj" % self.py_name)
-            self.cpp_class.write_post_instance_creation_code(wrapper.before_call,
+            cpp_class.write_post_instance_creation_code(wrapper.before_call,
                                                              "%s->obj" % self.py_name,
                                                              '')
             wrapper.call_params.append('*%s->obj' % (self.py_name,))
@@ -3157,10 +3216,10 @@ class CppClassRefParameter(CppClassParameterBase):
             assert not self.take_value_from_python_self
 
             self.py_name = wrapper.declarations.declare_variable(
-                self.cpp_class.pystruct+'*', self.name)
+                cpp_class.pystruct_ptr, self.name)
 
             wrapper.parse_params.add_parameter(
-                'O!', ['&'+self.cpp_class.pytypestruct, '&'+self.py_name], self.name)
+                'O!', [cpp_class.pytypestruct_amp, '&'+self.py_name], self.name)
             wrapper.call_params.append(
                 '*%s->obj' % (self.py_name))
 
@@ -3169,7 +3228,7 @@ class CppClassRefParameter(CppClassParameterBase):
         assert isinstance(wrapper, ReverseWrapperBase)
 
         self.py_name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', 'py_'+self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, 'py_'+self.cpp_class.name)
         self.cpp_class.write_allocate_pystruct(wrapper.before_call, self.py_name)
         if self.cpp_class.allow_subclassing:
             wrapper.before_call.write_code(
@@ -3251,7 +3310,7 @@ class CppClassReturnValue(CppClassReturnValueBase):
     def convert_c_to_python(self, wrapper):
         """see ReturnValue.convert_c_to_python"""
         py_name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', 'py_'+self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, 'py_'+self.cpp_class.name)
         self.py_name = py_name
         self.cpp_class.write_allocate_pystruct(wrapper.after_call, self.py_name)
         if self.cpp_class.allow_subclassing:
@@ -3278,9 +3337,9 @@ class CppClassReturnValue(CppClassReturnValueBase):
         if self.type_traits.type_is_reference:
             raise NotSupportedError
         name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', "tmp_%s" % self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, "tmp_%s" % self.cpp_class.name)
         wrapper.parse_params.add_parameter(
-            'O!', ['&'+self.cpp_class.pytypestruct, '&'+name])
+            'O!', [self.cpp_class.pytypestruct_amp, '&'+name])
         if self.REQUIRES_ASSIGNMENT_CONSTRUCTOR:
             wrapper.after_call.write_code('%s %s = *%s->obj;' %
                                           (self.cpp_class.full_name, self.value, name))
@@ -3322,7 +3381,7 @@ class CppClassRefReturnValue(CppClassReturnValueBase):
     def convert_c_to_python(self, wrapper):
         """see ReturnValue.convert_c_to_python"""
         py_name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', 'py_'+self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, 'py_'+self.cpp_class.name)
         self.py_name = py_name
 
         if self.reference_existing_object or self.caller_owns_return or not self.caller_manages_return:
@@ -3359,9 +3418,9 @@ class CppClassRefReturnValue(CppClassReturnValueBase):
         ):
             raise NotSupportedError("non-const reference return not supported")
         name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', "tmp_%s" % self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, "tmp_%s" % self.cpp_class.name)
         wrapper.parse_params.add_parameter(
-            'O!', ['&'+self.cpp_class.pytypestruct, '&'+name])
+            'O!', [self.cpp_class.pytypestruct_amp, '&'+name])
         if self.REQUIRES_ASSIGNMENT_CONSTRUCTOR:
             wrapper.after_call.write_code('%s %s = *%s->obj;' %
                                           (self.cpp_class.full_name, self.value, name))
@@ -3439,16 +3498,17 @@ class CppClassPtrParameter(CppClassParameterBase):
         "parses python args to get C++ value"
         #assert isinstance(wrapper, ForwardWrapperBase)
         #assert isinstance(self.cpp_class, cppclass.CppClass)
+        cpp_class = self.cpp_class
 
         if self.take_value_from_python_self:
             self.py_name = 'self'
             value_ptr = 'self->obj'
         else:
             self.py_name = wrapper.declarations.declare_variable(
-                self.cpp_class.pystruct+'*', self.name,
+                cpp_class.pystruct_ptr, self.name,
                 initializer=(self.default_value and 'NULL' or None))
 
-            value_ptr = wrapper.declarations.declare_variable("%s*" % self.cpp_class.full_name,
+            value_ptr = wrapper.declarations.declare_variable("%s*" % cpp_class.full_name,
                                                               "%s_ptr" % self.name)
 
             if self.null_ok:
@@ -3457,9 +3517,9 @@ class CppClassPtrParameter(CppClassParameterBase):
                 wrapper.before_call.write_error_check(
 
                     "%s && ((PyObject *) %s != Py_None) && !PyObject_IsInstance((PyObject *) %s, (PyObject *) &%s)"
-                    % (self.py_name, self.py_name, self.py_name, self.cpp_class.pytypestruct),
+                    % (self.py_name, self.py_name, self.py_name, cpp_class.pytypestruct),
 
-                    'PyErr_SetString(PyExc_TypeError, "Parameter %i must be of type %s");' % (num, self.cpp_class.name))
+                    'PyErr_SetString(PyExc_TypeError, "Parameter %i must be of type %s");' % (num, cpp_class.name))
 
                 wrapper.before_call.write_code("if (%(PYNAME)s) {\n"
                                                "    if ((PyObject *) %(PYNAME)s == Py_None)\n"
@@ -3473,23 +3533,23 @@ class CppClassPtrParameter(CppClassParameterBase):
             else:
 
                 wrapper.parse_params.add_parameter(
-                    'O!', ['&'+self.cpp_class.pytypestruct, '&'+self.py_name], self.name, optional=bool(self.default_value))
+                    'O!', [cpp_class.pytypestruct_amp, '&'+self.py_name], self.name, optional=bool(self.default_value))
                 wrapper.before_call.write_code("%s = (%s ? %s->obj : NULL);" % (value_ptr, self.py_name, self.py_name))
 
         value = self.transformation.transform(self, wrapper.declarations, wrapper.before_call, value_ptr)
         wrapper.call_params.append(value)
 
         if self.transfer_ownership:
-            if not isinstance(self.cpp_class.memory_policy, ReferenceCountingPolicy):
+            if not cpp_class.reference_counted:
                 # if we transfer ownership, in the end we no longer own the object, so clear our pointer
                 wrapper.after_call.write_code('if (%s) {' % self.py_name)
                 wrapper.after_call.indent()
-                if self.cpp_class.memory_policy is not None:
-                    self.cpp_class.wrapper_registry.write_unregister_wrapper(wrapper.after_call,
+                if cpp_class.memory_policy is not None:
+                    cpp_class.wrapper_registry.write_unregister_wrapper(wrapper.after_call,
                                                                             '%s' % self.py_name,
-                                                                            self.cpp_class.memory_policy.get_pointer_to_void_name('%s->obj' % self.py_name))
+                                                                            cpp_class.memory_policy.get_pointer_to_void_name('%s->obj' % self.py_name))
                 else:
-                    self.cpp_class.wrapper_registry.write_unregister_wrapper(wrapper.after_call,
+                    cpp_class.wrapper_registry.write_unregister_wrapper(wrapper.after_call,
                                                                             '%s' % self.py_name,
                                                                             '%s->obj' % self.py_name)
                 wrapper.after_call.write_code('%s->obj = NULL;' % self.py_name)
@@ -3498,13 +3558,14 @@ class CppClassPtrParameter(CppClassParameterBase):
             else:
                 wrapper.before_call.write_code("if (%s) {" % self.py_name)
                 wrapper.before_call.indent()
-                self.cpp_class.memory_policy.write_incref(wrapper.before_call, "%s->obj" % self.py_name)
+                cpp_class.memory_policy.write_incref(wrapper.before_call, "%s->obj" % self.py_name)
                 wrapper.before_call.unindent()
                 wrapper.before_call.write_code("}")
 
 
     def convert_c_to_python(self, wrapper):
         """foo"""
+        cpp_class = self.cpp_class
 
         ## Value transformations
         value = self.transformation.untransform(
@@ -3512,7 +3573,7 @@ class CppClassPtrParameter(CppClassParameterBase):
 
         ## declare wrapper variable
         py_name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', 'py_'+self.cpp_class.name)
+            cpp_class.pystruct_ptr, 'py_'+cpp_class.name)
         self.py_name = py_name
 
         def write_create_new_wrapper():
@@ -3521,21 +3582,20 @@ class CppClassPtrParameter(CppClassParameterBase):
             ## Find out what Python wrapper to use, in case
             ## automatic_type_narrowing is active and we are not forced to
             ## make a copy of the object
-            if (self.cpp_class.automatic_type_narrowing
-                and (self.transfer_ownership or isinstance(self.cpp_class.memory_policy,
-                                                           ReferenceCountingPolicy))):
+            if (cpp_class.automatic_type_narrowing
+                and (self.transfer_ownership or cpp_class.reference_counted)):
 
-                typeid_map_name = self.cpp_class.get_type_narrowing_root().typeid_map_name
+                typeid_map_name = cpp_class.get_type_narrowing_root().typeid_map_name
                 wrapper_type = wrapper.declarations.declare_variable(
                     'PyTypeObject*', 'wrapper_type', '0')
                 wrapper.before_call.write_code(
                     '%s = %s.lookup_wrapper(typeid(*%s), &%s);'
-                    % (wrapper_type, typeid_map_name, value, self.cpp_class.pytypestruct))
+                    % (wrapper_type, typeid_map_name, value, cpp_class.pytypestruct))
             else:
-                wrapper_type = '&'+self.cpp_class.pytypestruct
+                wrapper_type = cpp_class.pytypestruct_amp
 
             ## Create the Python wrapper object
-            self.cpp_class.write_allocate_pystruct(wrapper.before_call, py_name, wrapper_type)
+            cpp_class.write_allocate_pystruct(wrapper.before_call, py_name, wrapper_type)
             wrapper.before_call.write_code("%s->flags = PYBINDGEN_WRAPPER_FLAG_NONE;" % py_name)
             self.py_name = py_name
 
@@ -3543,19 +3603,19 @@ class CppClassPtrParameter(CppClassParameterBase):
             if self.transfer_ownership:
                 wrapper.before_call.write_code("%s->obj = %s;" % (py_name, value))
             else:
-                if not isinstance(self.cpp_class.memory_policy, ReferenceCountingPolicy):
+                if not cpp_class.reference_counted:
                     ## The PyObject gets a temporary pointer to the
                     ## original value; the pointer is converted to a
                     ## copy in case the callee retains a reference to
                     ## the object after the call.
 
                     if self.direction == Parameter.DIRECTION_IN:
-                        if not self.cpp_class.has_copy_constructor:
-                            raise CodeGenerationError("Class {0} cannot be copied".format(self.cpp_class.full_name))
-                        self.cpp_class.write_create_instance(wrapper.before_call,
+                        if not cpp_class.has_copy_constructor:
+                            raise CodeGenerationError("Class {0} cannot be copied".format(cpp_class.full_name))
+                        cpp_class.write_create_instance(wrapper.before_call,
                                                              "%s->obj" % self.py_name,
                                                              '*'+self.value)
-                        self.cpp_class.write_post_instance_creation_code(wrapper.before_call,
+                        cpp_class.write_post_instance_creation_code(wrapper.before_call,
                                                                          "%s->obj" % self.py_name,
                                                                          '*'+self.value)
                     else:
@@ -3565,7 +3625,7 @@ class CppClassPtrParameter(CppClassParameterBase):
                         ## that the python code directly manipulates the object
                         ## received as parameter, instead of a copy.
                         if self.type_traits.target_is_const:
-                            unconst_value = "(%s*) (%s)" % (self.cpp_class.full_name, value)
+                            unconst_value = "(%s*) (%s)" % (cpp_class.full_name, value)
                         else:
                             unconst_value = value
                         wrapper.before_call.write_code(
@@ -3573,7 +3633,7 @@ class CppClassPtrParameter(CppClassParameterBase):
                         wrapper.build_params.add_parameter("O", [self.py_name])
                         wrapper.before_call.add_cleanup_code("Py_DECREF(%s);" % self.py_name)
 
-                        if self.cpp_class.has_copy_constructor:
+                        if cpp_class.has_copy_constructor:
                             ## if after the call we notice the callee kept a reference
                             ## to the pyobject, we then swap pywrapper->obj for a copy
                             ## of the original object.  Else the ->obj pointer is
@@ -3585,10 +3645,10 @@ class CppClassPtrParameter(CppClassParameterBase):
                                 "    %s->obj = NULL;\n"
                                 "else {\n" % (self.py_name, self.py_name))
                             wrapper.after_call.indent()
-                            self.cpp_class.write_create_instance(wrapper.after_call,
+                            cpp_class.write_create_instance(wrapper.after_call,
                                                                  "%s->obj" % self.py_name,
                                                                  '*'+value)
-                            self.cpp_class.write_post_instance_creation_code(wrapper.after_call,
+                            cpp_class.write_post_instance_creation_code(wrapper.after_call,
                                                                              "%s->obj" % self.py_name,
                                                                              '*'+value)
                             wrapper.after_call.unindent()
@@ -3599,52 +3659,52 @@ class CppClassPtrParameter(CppClassParameterBase):
                             wrapper.after_call.write_code("%s->obj = NULL;" % (self.py_name,))
                 else:
                     ## The PyObject gets a new reference to the same obj
-                    self.cpp_class.memory_policy.write_incref(wrapper.before_call, value)
+                    cpp_class.memory_policy.write_incref(wrapper.before_call, value)
                     if self.type_traits.target_is_const:
                         wrapper.before_call.write_code("%s->obj = (%s*) (%s);" %
-                                                       (py_name, self.cpp_class.full_name, value))
+                                                       (py_name, cpp_class.full_name, value))
                     else:
                         wrapper.before_call.write_code("%s->obj = %s;" % (py_name, value))
         ## closes def write_create_new_wrapper():
 
-        if self.cpp_class.helper_class is None:
+        if cpp_class.helper_class is None:
             try:
-                if self.cpp_class.memory_policy is not None:
-                    self.cpp_class.wrapper_registry.write_lookup_wrapper(
-                        wrapper.before_call, self.cpp_class.pystruct, py_name, self.cpp_class.memory_policy.get_pointer_to_void_name(value))
+                if cpp_class.memory_policy is not None:
+                    cpp_class.wrapper_registry.write_lookup_wrapper(
+                        wrapper.before_call, cpp_class.pystruct, py_name, cpp_class.memory_policy.get_pointer_to_void_name(value))
                 else:
-                    self.cpp_class.wrapper_registry.write_lookup_wrapper(
-                        wrapper.before_call, self.cpp_class.pystruct, py_name, value)
+                    cpp_class.wrapper_registry.write_lookup_wrapper(
+                        wrapper.before_call, cpp_class.pystruct, py_name, value)
             except NotSupportedError:
                 write_create_new_wrapper()
-                self.cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, py_name,
+                cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, py_name,
                                                                            "%s->obj" % py_name)
             else:
                 wrapper.before_call.write_code("if (%s == NULL)\n{" % py_name)
                 wrapper.before_call.indent()
                 write_create_new_wrapper()
-                self.cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, py_name,
+                cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, py_name,
                                                                            "%s->obj" % py_name)
                 wrapper.before_call.unindent()
                 wrapper.before_call.write_code('}')
             wrapper.build_params.add_parameter("N", [py_name])
         else:
             wrapper.before_call.write_code("if (typeid(*(%s)).name() == typeid(%s).name())\n{"
-                                          % (value, self.cpp_class.helper_class.name))
+                                          % (value, cpp_class.helper_class.name))
             wrapper.before_call.indent()
 
             if self.type_traits.target_is_const:
                 wrapper.before_call.write_code(
                     "%s = (%s*) (((%s*) ((%s*) %s))->m_pyself);"
-                    % (py_name, self.cpp_class.pystruct,
-                       self.cpp_class.helper_class.name, self.cpp_class.full_name, value))
+                    % (py_name, cpp_class.pystruct,
+                       cpp_class.helper_class.name, cpp_class.full_name, value))
                 wrapper.before_call.write_code("%s->obj =  (%s*) (%s);" %
-                                               (py_name, self.cpp_class.full_name, value))
+                                               (py_name, cpp_class.full_name, value))
             else:
                 wrapper.before_call.write_code(
                     "%s = (%s*) (((%s*) %s)->m_pyself);"
-                    % (py_name, self.cpp_class.pystruct,
-                       self.cpp_class.helper_class.name, value))
+                    % (py_name, cpp_class.pystruct,
+                       cpp_class.helper_class.name, value))
                 wrapper.before_call.write_code("%s->obj = %s;" % (py_name, value))
             wrapper.before_call.write_code("Py_INCREF(%s);" % py_name)
             wrapper.before_call.unindent()
@@ -3652,21 +3712,21 @@ class CppClassPtrParameter(CppClassParameterBase):
             wrapper.before_call.indent()
 
             try:
-                if self.cpp_class.memory_policy is not None:
-                    self.cpp_class.wrapper_registry.write_lookup_wrapper(
-                        wrapper.before_call, self.cpp_class.pystruct, py_name, self.cpp_class.memory_policy.get_pointer_to_void_name(value))
+                if cpp_class.memory_policy is not None:
+                    cpp_class.wrapper_registry.write_lookup_wrapper(
+                        wrapper.before_call, cpp_class.pystruct, py_name, cpp_class.memory_policy.get_pointer_to_void_name(value))
                 else:
-                    self.cpp_class.wrapper_registry.write_lookup_wrapper(
-                        wrapper.before_call, self.cpp_class.pystruct, py_name, value)
+                    cpp_class.wrapper_registry.write_lookup_wrapper(
+                        wrapper.before_call, cpp_class.pystruct, py_name, value)
             except NotSupportedError:
                 write_create_new_wrapper()
-                self.cpp_class.wrapper_registry.write_register_new_wrapper(
+                cpp_class.wrapper_registry.write_register_new_wrapper(
                     wrapper.before_call, py_name, "%s->obj" % py_name)
             else:
                 wrapper.before_call.write_code("if (%s == NULL)\n{" % py_name)
                 wrapper.before_call.indent()
                 write_create_new_wrapper()
-                self.cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, py_name,
+                cpp_class.wrapper_registry.write_register_new_wrapper(wrapper.before_call, py_name,
                                                                            "%s->obj" % py_name)
                 wrapper.before_call.unindent()
                 wrapper.before_call.write_code('}') # closes if (%s == NULL)
@@ -3774,7 +3834,7 @@ class CppClassPtrReturnValue(CppClassReturnValueBase):
 
         ## declare wrapper variable
         py_name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', 'py_'+self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, 'py_'+self.cpp_class.name)
         self.py_name = py_name
 
         common_shared_object_return(value, py_name, self.cpp_class, wrapper.after_call,
@@ -3794,16 +3854,16 @@ class CppClassPtrReturnValue(CppClassReturnValueBase):
     def convert_python_to_c(self, wrapper):
         """See ReturnValue.convert_python_to_c"""
         name = wrapper.declarations.declare_variable(
-            self.cpp_class.pystruct+'*', "tmp_%s" % self.cpp_class.name)
+            self.cpp_class.pystruct_ptr, "tmp_%s" % self.cpp_class.name)
         wrapper.parse_params.add_parameter(
-            'O!', ['&'+self.cpp_class.pytypestruct, '&'+name])
+            'O!', [self.cpp_class.pytypestruct_amp, '&'+name])
 
         value = self.transformation.transform(
             self, wrapper.declarations, wrapper.after_call, "%s->obj" % name)
 
         ## now the hairy part :)
         if self.caller_owns_return:
-            if not isinstance(self.cpp_class.memory_policy, ReferenceCountingPolicy):
+            if not self.cpp_class.reference_counted:
                 ## the caller receives a copy, if possible
                 try:
                     if not self.cpp_class.has_copy_constructor:
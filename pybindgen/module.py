@@ -255,6 +255,9 @@ class ModuleBase(dict):
         self.before_init = CodeBlock(error_return, self.declarations)
         self.after_init = CodeBlock(error_return, self.declarations,
                                     predecessor=self.before_init)
+        ## (typeid map name, C++ type, python type struct) entries,
+        ## emitted as a single table in the module init function
+        self.typeid_registrations = []
         self.c_function_name_transformer = None
         self.set_strip_prefix(name + '_')
         if parent is None:
@@ -674,6 +677,26 @@ class ModuleBase(dict):
             parent = parent.parent
         return names
 
+    def _generate_typeid_registrations(self):
+        """register all the classes of this module with their typeid maps,
+        using a table and a single loop instead of one call per class"""
+        entries = ["        {&%s, &typeid(%s), &%s}," % registration
+                   for registration in self.typeid_registrations]
+        code = ["{",
+                "    static const struct {",
+                "        pybindgen::TypeMap *map;",
+                "        const std::type_info *cpp_type_info;",
+                "        PyTypeObject *python_wrapper;",
+                "    } typeid_registrations[] = {"]
+        code.extend(entries)
+        code.extend(["    };",
+                     "    for (size_t i = 0; i < sizeof(typeid_registrations)/sizeof(typeid_registrations[0]); i++) {",
+                     "        typeid_registrations[i].map->register_wrapper(*typeid_registrations[i].cpp_type_info,",
+                     "                                                      typeid_registrations[i].python_wrapper);",
+                     "    }",
+                     "}"])
+        self.after_init.write_code('\n'.join(code))
+
     def do_generate(self, out, module_file_base_name=None):
         """(internal) Generates the module."""
         assert isinstance(out, _SinkManager)
@@ -766,6 +789,8 @@ class ModuleBase(dict):
                 sink.writeln()
                 class_.generate(sink, self)
                 sink.writeln()
+            if self.typeid_registrations:
+                self._generate_typeid_registrations()
 
         ## generate the containers
         if self.containers:
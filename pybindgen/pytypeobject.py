@@ -2,6 +2,54 @@
 The class PyTypeObject generates a PyTypeObject structure contents.
 """
 
+import re
+
+_TEMPLATE_RX = re.compile(r'%\((\w+)\)s')
+
+
+def _compile_template(template):
+    """
+    Splits a %(name)s style template, once, into the literal text
+    chunks and the names of the slots found in between them, both as
+    immutable tuples.
+    """
+    chunks = _TEMPLATE_RX.split(template)
+    return tuple(chunks[0::2]), tuple(chunks[1::2])
+
+
+def _render_template(parts, keys, slots):
+    """
+    Renders a template previously split by _compile_template(); same
+    result as `template % slots`, but without re-parsing the template.
+    """
+    l = [None]*(2*len(keys) + 1)
+    l[0::2] = parts
+    l[1::2] = [slots[key] for key in keys]
+    try:
+        return ''.join(l)
+    except TypeError:
+        ## some slot value is not a string; convert like %s would
+        return ''.join(['%s' % (x,) for x in l])
+
+
+def _bake_template(parts, keys, slots, names):
+    """
+    Partially renders a template previously split by
+    _compile_template(): every slot not in `names` is folded into the
+    literal chunks, and only the slots in `names` remain to be filled.
+    """
+    new_parts = [parts[0]]
+    new_keys = []
+    for key, part in zip(keys, parts[1:]):
+        if key in names:
+            new_keys.append(key)
+            new_parts.append(part)
+        else:
+            ## slot values need not be strings, as with `template % slots`
+            new_parts[-1] += '%s%s' % (slots[key], part)
+    return tuple(new_parts), tuple(new_keys)
+
+
 class PyTypeObject(object):
     TEMPLATE = (
         'PyTypeObject %(typestruct)s = {\n'
@@ -58,6 +106,57 @@ class PyTypeObject(object):
         '    (destructor) NULL                  /* tp_del */\n'
         '};\n'
         )
+    _TEMPLATE_PARTS, _TEMPLATE_KEYS = _compile_template(TEMPLATE)
+
+    ## values of the slots that were not explicitly set
+    _DEFAULT_SLOTS = {
+        'tp_dealloc': 'NULL',
+        'tp_getattr': 'NULL',
+        'tp_setattr': 'NULL',
+        'tp_compare': 'NULL',
+        'tp_repr': 'NULL',
+        'tp_as_number': 'NULL',
+        'tp_as_sequence': 'NULL',
+        'tp_as_mapping': 'NULL',
+        'tp_hash': 'NULL',
+        'tp_call': 'NULL',
+        'tp_str': 'NULL',
+        'tp_getattro': 'NULL',
+        'tp_setattro': 'NULL',
+        'tp_as_buffer': 'NULL',
+        'tp_flags': 'Py_TPFLAGS_DEFAULT',
+        'tp_doc': 'NULL',
+        'tp_traverse': 'NULL',
+        'tp_clear': 'NULL',
+        'tp_richcompare': 'NULL',
+        'tp_weaklistoffset': '0',
+        'tp_iter': 'NULL',
+        'tp_iternext': 'NULL',
+        'tp_methods': 'NULL',
+        'tp_getset': 'NULL',
+        'tp_descr_get': 'NULL',
+        'tp_descr_set': 'NULL',
+        'tp_dictoffset': '0',
+        'tp_init': 'NULL',
+        'tp_alloc': 'PyType_GenericAlloc',
+        'tp_new': 'PyType_GenericNew',
+        'tp_free': '0',
+        'tp_is_gc': 'NULL',
+        }
+
+    ## slots that usually name per-type structures or functions; the
+    ## remaining ones tend to hold the same values for many types
+    _IDENTITY_SLOTS = frozenset([
+            'typestruct', 'tp_name', 'tp_basicsize', 'tp_dealloc', 'tp_doc',
+            'tp_traverse', 'tp_clear', 'tp_methods', 'tp_getset',
+            'tp_dictoffset', 'tp_init', 'tp_iter', 'tp_iternext', 'tp_str',
+            'tp_repr', 'tp_call', 'tp_hash', 'tp_richcompare', 'tp_as_number',
+            'tp_as_sequence', 'tp_as_mapping', 'tp_getattro', 'tp_setattro'])
+    _STRUCTURAL_SLOTS = tuple(sorted(set(_TEMPLATE_KEYS) - _IDENTITY_SLOTS))
+
+    ## structural slot values => template with those values baked in;
+    ## only a handful of distinct shapes occur, so it is not bounded
+    _baked_templates = {}
 
     def __init__(self):
         self.slots = {}
@@ -68,42 +167,17 @@ class PyTypeObject(object):
         'tp_name', 'tp_basicsize', and the pseudo-slot 'typestruct'.
         """
 
-        slots = dict(self.slots)
-
-        slots.setdefault('tp_dealloc', 'NULL')
-        slots.setdefault('tp_getattr', 'NULL')
-        slots.setdefault('tp_setattr', 'NULL')
-        slots.setdefault('tp_compare', 'NULL')
-        slots.setdefault('tp_repr', 'NULL')
-        slots.setdefault('tp_as_number', 'NULL')
-        slots.setdefault('tp_as_sequence', 'NULL')
-        slots.setdefault('tp_as_mapping', 'NULL')
-        slots.setdefault('tp_hash', 'NULL')
-        slots.setdefault('tp_call', 'NULL')
-        slots.setdefault('tp_str', 'NULL')
-        slots.setdefault('tp_getattro', 'NULL')
-        slots.setdefault('tp_setattro', 'NULL')
-        slots.setdefault('tp_as_buffer', 'NULL')
-        slots.setdefault('tp_flags', 'Py_TPFLAGS_DEFAULT')
-        slots.setdefault('tp_doc', 'NULL')
-        slots.setdefault('tp_traverse', 'NULL')
-        slots.setdefault('tp_clear', 'NULL')
-        slots.setdefault('tp_richcompare', 'NULL')
-        slots.setdefault('tp_weaklistoffset', '0')
-        slots.setdefault('tp_iter', 'NULL')
-        slots.setdefault('tp_iternext', 'NULL')
-        slots.setdefault('tp_methods', 'NULL')
-        slots.setdefault('tp_getset', 'NULL')
-        slots.setdefault('tp_descr_get', 'NULL')
-        slots.setdefault('tp_descr_set', 'NULL')
-        slots.setdefault('tp_dictoffset', '0')
-        slots.setdefault('tp_init', 'NULL')
-        slots.setdefault('tp_alloc', 'PyType_GenericAlloc')
-        slots.setdefault('tp_new', 'PyType_GenericNew')
-        slots.setdefault('tp_free', '0')
-        slots.setdefault('tp_is_gc', 'NULL')
-
-        code_sink.writeln(self.TEMPLATE % slots)
+        slots = dict(self._DEFAULT_SLOTS)
+        slots.update(self.slots)
+
+        structural = tuple([slots[key] for key in self._STRUCTURAL_SLOTS])
+        cache = PyTypeObject._baked_templates
+        try:
+            parts, keys = cache[structural]
+        except KeyError:
+            parts, keys = cache[structural] = _bake_template(
+                self._TEMPLATE_PARTS, self._TEMPLATE_KEYS, slots, self._IDENTITY_SLOTS)
+        code_sink.writeln(_render_template(parts, keys, slots))
 
 
 class PyNumberMethods(object):
@@ -202,6 +276,51 @@ class PyNumberMethods(object):
 
         '};\n'
         )
+    _TEMPLATE_PARTS, _TEMPLATE_KEYS = _compile_template(TEMPLATE)
+
+    ## values of the slots that were not explicitly set
+    _DEFAULT_SLOTS = {
+        'nb_add': 'NULL',
+        'nb_bool': 'NULL',
+        'nb_subtract': 'NULL',
+        'nb_multiply': 'NULL',
+        'nb_divide': 'NULL',
+        'nb_remainder': 'NULL',
+        'nb_divmod': 'NULL',
+        'nb_power': 'NULL',
+        'nb_negative': 'NULL',
+        'nb_positive': 'NULL',
+        'nb_absolute': 'NULL',
+        'nb_nonzero': 'NULL',
+        'nb_invert': 'NULL',
+        'nb_lshift': 'NULL',
+        'nb_rshift': 'NULL',
+        'nb_and': 'NULL',
+        'nb_xor': 'NULL',
+        'nb_or': 'NULL',
+        'nb_coerce': 'NULL',
+        'nb_int': 'NULL',
+        'nb_long': 'NULL',
+        'nb_float': 'NULL',
+        'nb_oct': 'NULL',
+        'nb_hex': 'NULL',
+        'nb_inplace_add': 'NULL',
+        'nb_inplace_subtract': 'NULL',
+        'nb_inplace_multiply': 'NULL',
+        'nb_inplace_divide': 'NULL',
+        'nb_inplace_remainder': 'NULL',
+        'nb_inplace_power': 'NULL',
+        'nb_inplace_lshift': 'NULL',
+        'nb_inplace_rshift': 'NULL',
+        'nb_inplace_and': 'NULL',
+        'nb_inplace_xor': 'NULL',
+        'nb_inplace_or': 'NULL',
+        'nb_floor_divide': 'NULL',
+        'nb_true_divide': 'NULL',
+        'nb_inplace_floor_divide': 'NULL',
+        'nb_inplace_true_divide': 'NULL',
+        'nb_index': 'NULL',
+        }
 
     def __init__(self):
         self.slots = {}
@@ -211,50 +330,10 @@ class PyNumberMethods(object):
         Generates the structure.  All slots are optional except 'variable'.
         """
 
-        slots = dict(self.slots)
-
-        slots.setdefault('nb_add', 'NULL')
-        slots.setdefault('nb_bool', 'NULL')
-        slots.setdefault('nb_subtract', 'NULL')
-        slots.setdefault('nb_multiply', 'NULL')
-        slots.setdefault('nb_divide', 'NULL')
-        slots.setdefault('nb_remainder', 'NULL')
-        slots.setdefault('nb_divmod', 'NULL')
-        slots.setdefault('nb_power', 'NULL')
-        slots.setdefault('nb_negative', 'NULL')
-        slots.setdefault('nb_positive', 'NULL')
-        slots.setdefault('nb_absolute', 'NULL')
-        slots.setdefault('nb_nonzero', 'NULL')
-        slots.setdefault('nb_invert', 'NULL')
-        slots.setdefault('nb_lshift', 'NULL')
-        slots.setdefault('nb_rshift', 'NULL')
-        slots.setdefault('nb_and', 'NULL')
-        slots.setdefault('nb_xor', 'NULL')
-        slots.setdefault('nb_or', 'NULL')
-        slots.setdefault('nb_coerce', 'NULL')
-        slots.setdefault('nb_int', 'NULL')
-        slots.setdefault('nb_long', 'NULL')
-        slots.setdefault('nb_float', 'NULL')
-        slots.setdefault('nb_oct', 'NULL')
-        slots.setdefault('nb_hex', 'NULL')
-        slots.setdefault('nb_inplace_add', 'NULL')
-        slots.setdefault('nb_inplace_subtract', 'NULL')
-        slots.setdefault('nb_inplace_multiply', 'NULL')
-        slots.setdefault('nb_inplace_divide', 'NULL')
-        slots.setdefault('nb_inplace_remainder', 'NULL')
-        slots.setdefault('nb_inplace_power', 'NULL')
-        slots.setdefault('nb_inplace_lshift', 'NULL')
-        slots.setdefault('nb_inplace_rshift', 'NULL')
-        slots.setdefault('nb_inplace_and', 'NULL')
-        slots.setdefault('nb_inplace_xor', 'NULL')
-        slots.setdefault('nb_inplace_or', 'NULL')
-        slots.setdefault('nb_floor_divide', 'NULL')
-        slots.setdefault('nb_true_divide', 'NULL')
-        slots.setdefault('nb_inplace_floor_divide', 'NULL')
-        slots.setdefault('nb_inplace_true_divide', 'NULL')
-        slots.setdefault('nb_index', 'NULL')
-
-        code_sink.writeln(self.TEMPLATE % slots)
+        slots = dict(self._DEFAULT_SLOTS)
+        slots.update(self.slots)
+
+        code_sink.writeln(_render_template(self._TEMPLATE_PARTS, self._TEMPLATE_KEYS, slots))
 
 class PySequenceMethods(object):
     TEMPLATE = '''
@@ -281,6 +360,21 @@ static PySequenceMethods %(variable)s = {
 };
 
 '''
+    _TEMPLATE_PARTS, _TEMPLATE_KEYS = _compile_template(TEMPLATE)
+
+    ## values of the slots that were not explicitly set
+    _DEFAULT_SLOTS = {
+        'sq_length': 'NULL',
+        'sq_concat': 'NULL',
+        'sq_repeat': 'NULL',
+        'sq_item': 'NULL',
+        'sq_slice': 'NULL',
+        'sq_ass_item': 'NULL',
+        'sq_ass_slice': 'NULL',
+        'sq_contains': 'NULL',
+        'sq_inplace_concat': 'NULL',
+        'sq_inplace_repeat': 'NULL',
+        }
 
     FUNCTION_TEMPLATES = {
         # __len__
@@ -543,18 +637,8 @@ static PyObject*
         Generates the structure.  All slots are optional except 'variable'.
         """
 
-        slots = dict(self.slots)
-
-        slots.setdefault('sq_length', 'NULL')
-        slots.setdefault('sq_concat', 'NULL')
-        slots.setdefault('sq_repeat', 'NULL')
-        slots.setdefault('sq_item', 'NULL')
-        slots.setdefault('sq_slice', 'NULL')
-        slots.setdefault('sq_ass_item', 'NULL')
-        slots.setdefault('sq_ass_slice', 'NULL')
-        slots.setdefault('sq_contains', 'NULL')
-        slots.setdefault('sq_inplace_concat', 'NULL')
-        slots.setdefault('sq_inplace_repeat', 'NULL')
+        slots = dict(self._DEFAULT_SLOTS)
+        slots.update(self.slots)
 
-        code_sink.writeln(self.TEMPLATE % slots)
+        code_sink.writeln(_render_template(self._TEMPLATE_PARTS, self._TEMPLATE_KEYS, slots))
 
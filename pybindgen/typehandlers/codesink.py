@@ -59,6 +59,12 @@ class CodeSink(object):
         """Write one or more lines of code"""
         raise NotImplementedError
 
+    def write_many(self, lines):
+        """Write a list of lines of code at once; same as calling
+        writeln() for each line, but with a single call"""
+        if lines:
+            self.writeln('\n'.join(lines))
+
     def indent(self, level=4):
         '''Add a certain ammount of indentation to all lines written
         from now on and until unindent() is called'''
@@ -101,6 +107,19 @@ class FileCodeSink(CodeSink):
         if isinstance(other, FileCodeSink):
             return self.file.name < other.file.name
 
+def write_lines(sink, lines):
+    """
+    Writes a list of lines of code to a code sink, using
+    CodeSink.write_many() when available; other sink objects that only
+    implement writeln() get one writeln() call per line.
+    """
+    if isinstance(sink, CodeSink):
+        sink.write_many(lines)
+    else:
+        for line in lines:
+            sink.writeln(line)
+
+
 class MemoryCodeSink(CodeSink):
     """A code sink that keeps the code in memory,
     and can later flush the code to another code sink"""
@@ -118,8 +137,7 @@ class MemoryCodeSink(CodeSink):
         :param sink: another CodeSink instance
         """
         assert isinstance(sink, CodeSink)
-        for line in self.lines:
-            sink.writeln(line.rstrip())
+        sink.write_many([line.rstrip() for line in self.lines])
         self.lines = []
 
     def flush(self):
@@ -8,7 +8,8 @@ from .base import Parameter, ReturnValue, \
     DeclarationsScope, CodeBlock, NotSupportedError, ForwardWrapperBase, ReverseWrapperBase, \
     TypeConfigurationError
 
-from pybindgen.cppclass import SmartPointerPolicy, CppClass, CppClassParameterBase, CppClassReturnValueBase, common_shared_object_return
+from pybindgen.cppclass import SmartPointerPolicy, CppClass, CppClassParameterBase, CppClassReturnValueBase, common_shared_object_return, \
+    make_cpp_class_type_handler
 
 class BoostSharedPtr(SmartPointerPolicy):
     def __init__(self, class_name):
@@ -39,21 +40,17 @@ class BoostSharedPtr(SmartPointerPolicy):
         return "new(&%s->obj) %s;" % (obj, self.get_pointer_name(cpp_class.full_name),)
 
     def register_ptr_parameter_and_return(self, cls, name):
-        class ThisClassSharedPtrParameter(CppClassSharedPtrParameter):
-            """Register this C++ class as pass-by-pointer parameter"""
-            CTYPES = []
-            cpp_class = cls
-        cls.ThisClassSharedPtrParameter = ThisClassSharedPtrParameter
+        cls.ThisClassSharedPtrParameter = make_cpp_class_type_handler(
+            CppClassSharedPtrParameter, cls, 'ThisClassSharedPtrParameter',
+            "Register C++ class %s as pass-by-pointer parameter" % name)
         try:
             param_type_matcher.register(self.get_pointer_name(cls.full_name), cls.ThisClassSharedPtrParameter)
         except ValueError:
             pass
 
-        class ThisClassSharedPtrReturn(CppClassSharedPtrReturnValue):
-            """Register this C++ class as pointer return"""
-            CTYPES = []
-            cpp_class = cls
-        cls.ThisClassSharedPtrReturn = ThisClassSharedPtrReturn
+        cls.ThisClassSharedPtrReturn = make_cpp_class_type_handler(
+            CppClassSharedPtrReturnValue, cls, 'ThisClassSharedPtrReturn',
+            "Register C++ class %s as pointer return" % name)
         try:
             return_type_matcher.register(self.get_pointer_name(cls.full_name), cls.ThisClassSharedPtrReturn)
         except ValueError:
@@ -2,7 +2,7 @@ from __future__ import unicode_literals, print_function
 import pybindgen.typehandlers.base as typehandlers
 from pybindgen.typehandlers import stringtype, ctypeparser
 import pybindgen.typehandlers.codesink as codesink
-from pybindgen import module, cppclass, overloading, utils
+from pybindgen import module, cppclass, overloading, utils, pytypeobject
 
 
 import unittest
@@ -62,6 +62,106 @@ class ParamLookupTests(unittest.TestCase):
         self.assertTrue(transformed.has_been_transformed)
 
 
+class CppClassTypeHandlerTests(unittest.TestCase):
+
+    ## the classes register themselves with the global type matchers,
+    ## so they can only be created once
+    mod = module.Module('typehandlertest')
+    foo = mod.add_class('TypeHandlerTestFoo')
+    bar = mod.add_class('TypeHandlerTestBar')
+
+    def testLookup(self):
+        self.assertTrue(typehandlers.param_type_matcher.lookup('TypeHandlerTestFoo')[0]
+                        is self.foo.ThisClassParameter)
+        self.assertTrue(typehandlers.return_type_matcher.lookup('TypeHandlerTestFoo*')[0]
+                        is self.foo.ThisClassPtrReturn)
+
+    def testCall(self):
+        param = self.foo.ThisClassParameter('TypeHandlerTestFoo', 'foo')
+        self.assertTrue(param.cpp_class is self.foo)
+        self.assertEqual(param.name, 'foo')
+        retval = typehandlers.ReturnValue.new('TypeHandlerTestFoo*', caller_owns_return=True)
+        self.assertTrue(retval.cpp_class is self.foo)
+
+    def testIsinstance(self):
+        param = self.foo.ThisClassParameter('TypeHandlerTestFoo', 'foo')
+        self.assertTrue(isinstance(param, self.foo.ThisClassParameter))
+        self.assertTrue(isinstance(param, cppclass.CppClassParameter))
+        self.assertFalse(isinstance(param, self.bar.ThisClassParameter))
+        self.assertFalse(isinstance(param, self.foo.ThisClassRefParameter))
+
+    def testIssubclass(self):
+        self.assertTrue(issubclass(self.foo.ThisClassParameter, cppclass.CppClassParameter))
+        self.assertTrue(issubclass(self.foo.ThisClassPtrParameter, typehandlers.Parameter))
+        self.assertTrue(issubclass(self.foo.ThisClassPtrReturn, typehandlers.ReturnValue))
+        self.assertFalse(issubclass(self.foo.ThisClassParameter, self.bar.ThisClassParameter))
+
+    def testClassAttributes(self):
+        handler = self.foo.ThisClassPtrParameter
+        self.assertEqual(handler.DIRECTIONS, cppclass.CppClassPtrParameter.DIRECTIONS)
+        self.assertTrue(handler.SUPPORTS_TRANSFORMATIONS)
+        self.assertEqual(handler.__name__, 'ThisClassPtrParameter')
+        self.assertEqual(handler.__doc__,
+                         "Register C++ class TypeHandlerTestFoo as pass-by-pointer parameter")
+        self.assertEqual(self.foo.ThisClassReturn.__name__, 'ThisClassReturn')
+        self.assertTrue(handler.cpp_class is self.foo)
+        self.assertTrue('TypeHandlerTestFoo*' in handler.CTYPES)
+        self.assertFalse('TypeHandlerTestFoo*' in cppclass.CppClassPtrParameter.CTYPES)
+        self.assertFalse('TypeHandlerTestFoo*' in self.bar.ThisClassPtrParameter.CTYPES)
+
+
+class PyTypeObjectTests(unittest.TestCase):
+
+    def assertRendersLikeTemplate(self, struct, defaults):
+        sink = codesink.MemoryCodeSink()
+        struct.generate(sink)
+        expected = codesink.MemoryCodeSink()
+        slots = dict(defaults)
+        slots.update(struct.slots)
+        expected.writeln(struct.TEMPLATE % slots)
+        self.assertEqual(sink.lines, expected.lines)
+
+    def testNonStringSlots(self):
+        pytype = pytypeobject.PyTypeObject()
+        pytype.slots.update(typestruct='PyNonStringSlots_Type', tp_name='test.NonStringSlots',
+                            tp_basicsize='sizeof(PyNonStringSlots)', tp_weaklistoffset=0)
+        self.assertRendersLikeTemplate(pytype, pytypeobject.PyTypeObject._DEFAULT_SLOTS)
+        ## per-type slots are filled in at render time, not baked
+        pytype.slots['tp_dictoffset'] = 0
+        self.assertRendersLikeTemplate(pytype, pytypeobject.PyTypeObject._DEFAULT_SLOTS)
+
+    def testNonStringNumberAndSequenceSlots(self):
+        number_methods = pytypeobject.PyNumberMethods()
+        number_methods.slots.update(variable='NonStringSlots__py_number_methods', nb_index=0)
+        self.assertRendersLikeTemplate(number_methods, pytypeobject.PyNumberMethods._DEFAULT_SLOTS)
+        sequence_methods = pytypeobject.PySequenceMethods()
+        sequence_methods.slots.update(variable='NonStringSlots__py_sequence_methods', sq_slice=0)
+        self.assertRendersLikeTemplate(sequence_methods, pytypeobject.PySequenceMethods._DEFAULT_SLOTS)
+
+
+class CodeSinkTests(unittest.TestCase):
+
+    def testWriteLinesToPlainSink(self):
+        class WritelnOnlySink(object):
+            def __init__(self):
+                self.lines = []
+            def writeln(self, line=''):
+                self.lines.append(line)
+        sink = WritelnOnlySink()
+        codesink.write_lines(sink, ['foo();', '', 'bar();'])
+        self.assertEqual(sink.lines, ['foo();', '', 'bar();'])
+
+    def testWriteLinesToCodeSink(self):
+        sink1 = codesink.MemoryCodeSink()
+        sink2 = codesink.MemoryCodeSink()
+        for sink in sink1, sink2:
+            sink.indent()
+        codesink.write_lines(sink1, ['foo();', '', 'bar();'])
+        for line in ['foo();', '', 'bar();']:
+            sink2.writeln(line)
+        self.assertEqual(sink1.lines, sink2.lines)
+
+
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
@@ -84,6 +184,9 @@ if __name__ == '__main__':
 
     suite.addTest(doctest.DocTestSuite(ctypeparser))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(ParamLookupTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(CppClassTypeHandlerTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(PyTypeObjectTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(CodeSinkTests))
     runner = unittest.TextTestRunner()
     runner.run(suite)
 